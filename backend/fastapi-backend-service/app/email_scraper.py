@@ -1,50 +1,147 @@
 # file: app/email_scraper.py
 # This file contains both SpiderFoot integration and email scraping logic.
 
-import requests
-from bs4 import BeautifulSoup
-from collections import deque
+import asyncio
+import re
+import httpx
+import xxhash
+from bs4 import BeautifulSoup, SoupStrainer
+from typing import Dict, Set
 from urllib.parse import urljoin, urlparse
-import time
+
+try:
+    import hyperscan
+except ImportError:  # Optional: fall back to the stdlib regex engine
+    hyperscan = None
 
 SPIDERFOOT_URL = "http://127.0.0.1:5001/api/v1"
 
-def scrape_emails_from_domain(base_url: str, max_pages: int = 20):
-    """Scrape emails from a domain using BFS approach."""
+EMAIL_PATTERN = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b'
+EMAIL_RE = re.compile(EMAIL_PATTERN)
+
+# Hyperscan only prefilters: it finds whitespace-delimited tokens that could hold
+# an address ("@", then a "." with no whitespace in between), and EMAIL_RE runs on
+# those tokens alone. Addresses never contain whitespace and whitespace is never a
+# word character, so the result is the same as EMAIL_RE over the whole page.
+EMAIL_PREFILTER = rb'@\S*\.'
+_TOKEN_END_RE = re.compile(rb'\S*')
+_WHITESPACE = b' \t\n\r\f\v'
+EMAIL_DB = None
+if hyperscan is not None:
+    EMAIL_DB = hyperscan.Database()
+    EMAIL_DB.compile(expressions=[EMAIL_PREFILTER], ids=[0], flags=[0])
+
+# Only anchors with an href are needed for link discovery
+LINK_STRAINER = SoupStrainer('a', href=True)
+
+# hrefs that never lead to another page on the site
+SKIP_HREF_PREFIXES = ('mailto:', 'javascript:', '#')
+
+# Status polling backoff: start fast for short scans, back off to the cap for long ones
+POLL_INITIAL_DELAY = 0.5
+POLL_MAX_DELAY = 30
+
+# Shared HTTP client so repeated requests to the same host reuse pooled
+# keep-alive connections. Closed by the FastAPI lifespan in main.py.
+CLIENT = httpx.AsyncClient(
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+    http2=True,
+)
+
+
+def extract_emails(data: bytes) -> Set[str]:
+    """
+    Finds email addresses in raw page bytes.
+    Uses Hyperscan when it is installed and EMAIL_RE otherwise.
+    """
+    if EMAIL_DB is None:
+        return set(EMAIL_RE.findall(data.decode(errors='ignore')))
+
+    emails: Set[str] = set()
+    scanned_to = 0
+
+    def on_match(_id: int, _start: int, end: int, _flags: int, _context) -> None:
+        nonlocal scanned_to
+        # Matches in a token that was already searched add nothing
+        if end <= scanned_to:
+            return
+        token_start = max(data.rfind(ws, scanned_to, end) for ws in _WHITESPACE) + 1
+        token_start = max(token_start, scanned_to)
+        token_end = _TOKEN_END_RE.match(data, end).end()
+        emails.update(EMAIL_RE.findall(data[token_start:token_end].decode(errors='ignore')))
+        scanned_to = token_end
+
+    EMAIL_DB.scan(data, match_event_handler=on_match)
+    return emails
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """FastAPI dependency returning the shared HTTP client."""
+    return CLIENT
+
+
+async def scrape_emails_from_domain(base_url: str, max_pages: int = 20, client: httpx.AsyncClient = CLIENT,
+                                    concurrency: int = 10):
+    """
+    Scrape emails from a domain using BFS approach and return them as a set.
+    Each BFS level is fetched concurrently, with at most `concurrency` requests in flight.
+    """
     unique_emails = set()
-    urls_to_visit = deque([base_url])
-    visited_urls = {base_url}
+    frontier = [base_url]
+    # 64-bit URL hashes instead of full strings keep deep crawls small in memory;
+    # a collision only means one page is skipped.
+    visited_urls = {xxhash.xxh64_intdigest(base_url.encode())}
     page_count = 0
+    sem = asyncio.Semaphore(concurrency)
+    base_netloc = urlparse(base_url).netloc
 
-    while urls_to_visit and page_count < max_pages:
-        current_url = urls_to_visit.popleft()
-        page_count += 1
-
-        try:
-            response = requests.get(current_url, timeout=5)
+    async def fetch(url: str):
+        async with sem:
+            response = await client.get(url, timeout=5)
             response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
+            return response
+
+    while frontier and page_count < max_pages:
+        # Only fetch as many pages as the remaining budget allows
+        frontier = frontier[:max_pages - page_count]
+        page_count += len(frontier)
+
+        responses = await asyncio.gather(*[fetch(u) for u in frontier], return_exceptions=True)
+
+        next_frontier = []
+        for current_url, response in zip(frontier, responses):
+            # Skip pages that failed to fetch (HTTP errors, malformed URLs, ...);
+            # only cancellation and other non-Exception errors abort the crawl
+            if isinstance(response, Exception):
+                continue
+            if isinstance(response, BaseException):
+                raise response
 
-            # Find emails
-            email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-            found_on_page = set(re.findall(email_pattern, soup.get_text()))
-            unique_emails.update(found_on_page)
+            # Find emails directly in the page source, no DOM needed
+            unique_emails.update(extract_emails(response.content))
 
             # Find internal links
+            soup = BeautifulSoup(response.content, 'lxml', parse_only=LINK_STRAINER)
             for a_tag in soup.find_all('a', href=True):
                 href = a_tag['href']
-                absolute_url = urljoin(current_url, href)
-                if urlparse(absolute_url).netloc == urlparse(base_url).netloc and absolute_url not in visited_urls:
-                    urls_to_visit.append(absolute_url)
-                    visited_urls.add(absolute_url)
+                if href.startswith(SKIP_HREF_PREFIXES):
+                    continue
+                try:
+                    absolute_url = urljoin(current_url, href)
+                    netloc = urlparse(absolute_url).netloc
+                except ValueError:  # e.g. an unterminated IPv6 host
+                    continue
+                url_hash = xxhash.xxh64_intdigest(absolute_url.encode())
+                if url_hash not in visited_urls and netloc == base_netloc:
+                    next_frontier.append(absolute_url)
+                    visited_urls.add(url_hash)
 
-        except requests.RequestException:
-            continue
+        frontier = next_frontier
 
-    return list(unique_emails)
+    return unique_emails
 
 
-def run_spiderfoot_scan(target: str):
+async def run_spiderfoot_scan(target: str, client: httpx.AsyncClient = CLIENT):
     """
     Trigger a SpiderFoot scan for a given domain.
     Requires SpiderFoot to be running on 127.0.0.1:5001.
@@ -56,23 +153,25 @@ def run_spiderfoot_scan(target: str):
         "module": "all",
         "type": "domain"
     }
-    response = requests.post(url, data=data)
+    response = await client.post(url, data=data)
     response.raise_for_status()
     scan_info = response.json()
     scan_id = scan_info.get("scan_id")
 
-    # Wait for the scan to finish (simplified polling)
+    # Wait for the scan to finish, polling with exponential backoff
     status_url = f"{SPIDERFOOT_URL}/scan/{scan_id}"
+    delay = POLL_INITIAL_DELAY
     while True:
-        status_resp = requests.get(status_url)
+        status_resp = await client.get(status_url)
         status_resp.raise_for_status()
         status = status_resp.json().get("status")
         if status == "FINISHED":
             break
-        time.sleep(2)
+        await asyncio.sleep(delay)
+        delay = min(POLL_MAX_DELAY, delay * 2)
 
     # Get scan results
     result_url = f"{SPIDERFOOT_URL}/scan/{scan_id}/results"
-    results_resp = requests.get(result_url)
+    results_resp = await client.get(result_url)
     results_resp.raise_for_status()
     return results_resp.json()
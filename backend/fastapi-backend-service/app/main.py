@@ -1,14 +1,28 @@
 # file: app/main.py
 # FastAPI app
 
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+import logging
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List
 # Note: Assuming your email_scraper module is correctly implemented
-from .email_scraper import scrape_emails_from_domain, run_spiderfoot_scan
+from .email_scraper import CLIENT, get_http_client, scrape_emails_from_domain, run_spiderfoot_scan
 
-app = FastAPI()
+# Debug-level scan chatter is filtered out before any message formatting happens
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Close the shared HTTP client's pooled connections on shutdown
+    await CLIENT.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # --- START OF CORS FIX ---
 # Configure CORS to allow requests from your frontend.
@@ -36,22 +50,27 @@ class EmailsResponse(BaseModel):
     emails: List[str]
 
 @app.post("/scan/emails", response_model=EmailsResponse)
-async def email_scrape_endpoint(request: WebScrapeEmailsRequest):
+async def email_scrape_endpoint(
+    request: WebScrapeEmailsRequest,
+    client: httpx.AsyncClient = Depends(get_http_client),
+):
     if not request.domain:
         raise HTTPException(status_code=400, detail="Domain cannot be empty.")
 
     # Run SpiderFoot scan and/or scrape emails
     try:
-        spider_results = run_spiderfoot_scan(request.domain)
+        spider_results = await run_spiderfoot_scan(request.domain, client=client)
         # Optional: extract emails from SpiderFoot results if needed
     except Exception as e:
         # If SpiderFoot fails, fallback to basic scraping
         spider_results = []
 
-    found_emails = scrape_emails_from_domain(request.domain, max_pages=request.max_pages)
-    all_emails = list(set(found_emails + spider_results))  # combine results
+    emails = await scrape_emails_from_domain(request.domain, max_pages=request.max_pages, client=client)
+    # SpiderFoot may return a dict; only merge list results
+    if isinstance(spider_results, list):
+        emails.update(spider_results)
 
-    return {"emails": all_emails}
+    return {"emails": sorted(emails)}
 
 
 @app.get("/")
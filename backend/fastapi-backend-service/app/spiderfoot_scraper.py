@@ -1,22 +1,43 @@
-import requests
-import json
-import time
+import asyncio
+import httpx
 import re
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException
 from pydantic import BaseModel
 import uvicorn
 import logging
 from datetime import datetime
+from app.email_scraper import POLL_INITIAL_DELAY, POLL_MAX_DELAY
 
 # Configure logging for better visibility in the console
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Shared client for all SpiderFoot API calls. Keeping idle connections alive for
+# 5 minutes lets long-running status polls reuse the same connection. The pool
+# caps are httpx's defaults, which a Limits without them would remove.
+# http2=True only applies to https:// URLs: httpx does not negotiate h2c, so calls
+# to the plain-http SpiderFoot at SPIDERFOOT_URL use HTTP/1.1 keep-alive.
+CLIENT = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=300),
+)
+
+def get_http_client() -> httpx.AsyncClient:
+    """FastAPI dependency returning the shared SpiderFoot HTTP client."""
+    return CLIENT
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await CLIENT.aclose()
+
 # Initialize the FastAPI application.
 # FastAPI will automatically generate the Swagger UI at http://127.0.0.1:8000/docs
 app = FastAPI(
     title="SpiderFoot Scan API",
     description="An API to trigger SpiderFoot scans and retrieve results.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # URL for your local SpiderFoot instance.
@@ -29,7 +50,7 @@ class ScanRequest(BaseModel):
     target_domain: str
 
 # Helper function to start a new scan
-def start_new_scan(target_domain: str):
+async def start_new_scan(target_domain: str, client: httpx.AsyncClient = CLIENT):
     """
     Initiates a new SpiderFoot scan for the given domain.
     """
@@ -40,14 +61,13 @@ def start_new_scan(target_domain: str):
         "scanTarget": target_domain,
         "scanType": "investigate",
     }
-    headers = {"Content-Type": "application/json"}
 
     try:
         api_url = f"{SPIDERFOOT_URL}/api/v1/scans"
         if API_KEY:
             api_url += f"?api_key={API_KEY}"
         
-        response = requests.post(api_url, data=json.dumps(payload), headers=headers, timeout=10)
+        response = await client.post(api_url, json=payload, timeout=10)
         response.raise_for_status()
         
         scan_id = response.json().get('scanId')
@@ -58,14 +78,15 @@ def start_new_scan(target_domain: str):
         logging.error("Failed to get a scan ID from the response.")
         return None
         
-    except requests.exceptions.RequestException as e:
+    except (httpx.HTTPError, ValueError) as e:  # ValueError: body is not JSON
         logging.error(f"Error starting scan: {e}")
         raise HTTPException(status_code=500, detail=f"Error communicating with SpiderFoot: {e}")
 
 # Helper function to check scan status
-def check_scan_status(scan_id: str):
+async def check_scan_status(scan_id: str, client: httpx.AsyncClient = CLIENT):
     """
     Polls the SpiderFoot API to check the status of a scan until it's complete or aborted.
+    The delay between polls doubles after each check, up to POLL_MAX_DELAY seconds.
     """
     logging.info(f"Waiting for scan {scan_id} to complete...")
     
@@ -73,25 +94,28 @@ def check_scan_status(scan_id: str):
     if API_KEY:
         api_url += f"?api_key={API_KEY}"
 
+    delay = POLL_INITIAL_DELAY
     try:
         while True:
-            response = requests.get(api_url, timeout=10)
+            response = await client.get(api_url, timeout=10)
             response.raise_for_status()
-            status = response.json().get('status')
+            body = response.json()
+            status = body.get('status')
             
             if status in ["COMPLETE", "ABORTED", "FAILED"]:
                 return status
             
-            progress = response.json().get('progress', 0)
+            progress = body.get('progress', 0)
             logging.info(f"Scan status: {status}, Progress: {progress}%")
-            time.sleep(30)
-            
-    except requests.exceptions.RequestException as e:
+            await asyncio.sleep(delay)
+            delay = min(POLL_MAX_DELAY, delay * 2)
+        
+    except (httpx.HTTPError, ValueError) as e:
         logging.error(f"Error checking scan status: {e}")
         raise HTTPException(status_code=500, detail=f"Error communicating with SpiderFoot: {e}")
 
 # Helper function to retrieve scan results
-def get_scan_results(scan_id: str):
+async def get_scan_results(scan_id: str, client: httpx.AsyncClient = CLIENT):
     """
     Fetches the email results for a completed scan.
     """
@@ -102,7 +126,7 @@ def get_scan_results(scan_id: str):
         api_url += f"&api_key={API_KEY}"
 
     try:
-        response = requests.get(api_url, timeout=30)
+        response = await client.get(api_url, timeout=30)
         response.raise_for_status()
         
         results = response.json()
@@ -111,30 +135,30 @@ def get_scan_results(scan_id: str):
         logging.info(f"Found {len(unique_emails)} unique emails.")
         return unique_emails
         
-    except requests.exceptions.RequestException as e:
+    except (httpx.HTTPError, ValueError) as e:
         logging.error(f"Error retrieving results: {e}")
         raise HTTPException(status_code=500, detail=f"Error communicating with SpiderFoot: {e}")
 
 # Define the main API endpoint
 @app.post("/scan-and-scrape-emails/")
-async def scan_and_scrape_emails(request: ScanRequest):
+async def scan_and_scrape_emails(request: ScanRequest, client: httpx.AsyncClient = Depends(get_http_client)):
     """
     Triggers a new SpiderFoot scan and returns a list of discovered email addresses.
 
     - **target_domain**: The domain to be scanned (e.g., "example.com").
     """
     # Step 1: Start a new scan
-    scan_id = start_new_scan(request.target_domain)
+    scan_id = await start_new_scan(request.target_domain, client)
     if not scan_id:
         raise HTTPException(status_code=500, detail="Failed to initiate a new scan.")
     
     # Step 2: Wait for the scan to finish
-    scan_status = check_scan_status(scan_id)
+    scan_status = await check_scan_status(scan_id, client)
     if scan_status not in ["COMPLETE"]:
         raise HTTPException(status_code=500, detail=f"Scan ended with status: {scan_status}")
     
     # Step 3: Get the emails from the completed scan
-    emails = get_scan_results(scan_id)
+    emails = await get_scan_results(scan_id, client)
     
     # Return the final results
     return {
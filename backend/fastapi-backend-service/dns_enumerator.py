@@ -1,15 +1,25 @@
 import re
+import time
 import asyncio
 import httpx
-import socket
-import json
 import idna
-from typing import Dict, List, Any, Optional
+import logging
+import ijson
+import aiodns
+import pycares
+import dns.exception
+import dns.message
+import dns.rdatatype
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
 
 # ==========================================================
 # DNS Enumeration Feature
 # ==========================================================
 
+logger = logging.getLogger(__name__)
+
 # Simple wordlist for subdomain brute-forcing
 COMMON_SUBDOMAINS = [
     "www", "mail", "ftp", "blog", "dev", "test", "admin", "api", "webmail",
@@ -17,10 +27,56 @@ COMMON_SUBDOMAINS = [
     "docs", "support", "help", "app", "dashboard", "status", "forum", "news"
 ]
 
+# Shared HTTP/2 client so DoH and crt.sh requests reuse pooled connections
+CLIENT = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=50, max_connections=200),
+    timeout=30,
+)
+
+# c-ares resolver and the event loop it was created on. A resolver only works on
+# its own loop, so a new one is made whenever the running loop changes.
+_RESOLVER: Optional[aiodns.DNSResolver] = None
+_RESOLVER_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+def get_resolver() -> aiodns.DNSResolver:
+    """Returns the async DNS resolver for the running event loop."""
+    global _RESOLVER, _RESOLVER_LOOP
+    loop = asyncio.get_running_loop()
+    if _RESOLVER is None or _RESOLVER_LOOP is not loop:
+        _RESOLVER = aiodns.DNSResolver(loop=loop)
+        _RESOLVER_LOOP = loop
+    return _RESOLVER
+
+DNS_MESSAGE_HEADERS = {
+    "Accept": "application/dns-message",
+    "Content-Type": "application/dns-message",
+}
+
+# Reverse DNS answers: ip -> (hostname, fetched_at) on the monotonic clock, in LRU
+# order. Only successful lookups are stored, so failures are retried.
+PTR_CACHE_TTL = 3600
+PTR_CACHE_MAXSIZE = 4096
+_PTR_CACHE: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+# PTR lookups in flight, so concurrent callers for the same IP share one query
+_PTR_INFLIGHT: Dict[str, asyncio.Task] = {}
+
+# Max number of forward/reverse lookups in flight during enumeration
+RESOLVE_CONCURRENCY = 50
+
+# Dot-separated letter-digit-hyphen labels of at most 63 characters, with no
+# leading/trailing hyphen and no "--" in positions 3-4 (reserved for xn-- labels)
+_LDH_LABEL = r'(?![^.]{2}--)[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?'
+LDH_NAME_RE = re.compile(rf'(?:{_LDH_LABEL}\.)*{_LDH_LABEL}\.?')
+
+# MX record data is "<priority> <hostname>"
+MX_RE = re.compile(r'\d+\s+(.*)')
+
+@lru_cache(maxsize=4096)
 def normalizeDomainForDNS(domain: str) -> Optional[str]:
     """
     Normalizes a domain name for DNS resolution.
-    - Converts IDNs (internationalized domain names) to Punycode.
+    - Lowercases plain LDH domains directly; converts IDNs (internationalized domain names) to Punycode.
     - Filters out domains with invalid structures (e.g., consecutive dots).
     @param domain The domain string to normalize.
     @returns The normalized domain string, or None if it's invalid.
@@ -29,7 +85,13 @@ def normalizeDomainForDNS(domain: str) -> Optional[str]:
     if ".." in domain:
         return None
 
-    # 2. Attempt Punycode conversion for Internationalized Domain Names (IDN)
+    # 2. Plain LDH names need no IDNA conversion, so skip the (slow) idna codec for them.
+    #    Anything else (bad characters, long labels, xn-- labels) is validated by idna below.
+    lowered = domain.lower()
+    if len(lowered) <= 253 and LDH_NAME_RE.fullmatch(lowered):
+        return lowered
+
+    # 3. Attempt Punycode conversion for Internationalized Domain Names (IDN)
     try:
         # Use idna.encode to convert IDN to Punycode.
         punycode_domain = idna.encode(domain).decode('ascii').lower()
@@ -39,122 +101,190 @@ def normalizeDomainForDNS(domain: str) -> Optional[str]:
             return None
         return punycode_domain
     except idna.core.IDNAError as e:
-        print(f"IDNA encoding failed for {domain}: {e}")
+        logger.warning("IDNA encoding failed for %s: %s", domain, e)
         return None
     except Exception as e:
-        print(f"An unexpected error during domain normalization for {domain}: {e}")
+        logger.warning("An unexpected error during domain normalization for %s: %s", domain, e)
         return None
 
-async def get_dns_records(domain: str) -> Dict[str, Any]:
+async def _query(client: httpx.AsyncClient, domain: str, q_type: str) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
+    """
+    Fetches a single DNS record type for a domain via Cloudflare DoH,
+    using the binary application/dns-message wire format.
+    Returns (q_type, answers), where answers is None if the lookup failed.
+    """
+    cloudflare_doh = "https://cloudflare-dns.com/dns-query"
+    try:
+        logger.debug("Attempting to fetch %s record for %s...", q_type, domain)
+        query = dns.message.make_query(domain, q_type)
+        # DoH requests should use ID 0 so responses are cacheable (RFC 8484)
+        query.id = 0
+        response = await client.post(
+            cloudflare_doh,
+            content=query.to_wire(),
+            headers=DNS_MESSAGE_HEADERS,
+            timeout=10.0
+        )
+        response.raise_for_status()
+        message = dns.message.from_wire(response.content)
+        rdtype = dns.rdatatype.from_text(q_type)
+        answers = [
+            {"name": rrset.name.to_text(), "data": rdata.to_text()}
+            for rrset in message.answer if rrset.rdtype == rdtype
+            for rdata in rrset
+        ]
+        return q_type, answers
+    except httpx.RequestError as e:
+        logger.warning("Error fetching %s record for %s: %s. (Is %s reachable?)", q_type, domain, e, cloudflare_doh)
+    except dns.exception.DNSException as e:
+        logger.warning("Invalid DNS response from %s for %s: %s", cloudflare_doh, domain, e)
+    except Exception as e:
+        logger.warning("An unexpected error during %s lookup for %s: %s", q_type, domain, e)
+    return q_type, None
+
+async def get_dns_records(domain: str, client: httpx.AsyncClient = CLIENT) -> Dict[str, Any]:
     """
     Performs various DNS record lookups for a given domain.
+    All record types are queried concurrently.
     """
     records = {
         "A": [], "AAAA": [], "MX": [], "NS": [], "TXT": [], "CNAME": [], "SOA": None, "PTR": []
     }
     
-    cloudflare_doh = "https://cloudflare-dns.com/dns-query"
-    async with httpx.AsyncClient() as client:
-        query_types = ["A", "AAAA", "MX", "NS", "TXT", "CNAME", "SOA"]
-
-        for q_type in query_types:
-            try:
-                print(f"  Attempting to fetch {q_type} record for {domain}...")
-                response = await client.get(
-                    f"{cloudflare_doh}?name={domain}&type={q_type}",
-                    headers={"Accept": "application/dns-json"},
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                if data.get("Answer"):
-                    for answer in data["Answer"]:
-                        if q_type == "SOA":
-                            records["SOA"] = answer["data"]
-                            print(f"    Found SOA: {answer['data']}")
-                        elif q_type == "CNAME":
-                            records["CNAME"].append({"name": answer["name"], "target": answer["data"]})
-                            print(f"    Found CNAME: {answer['name']} -> {answer['data']}")
-                        else:
-                            records[q_type].append(answer["data"])
-                            print(f"    Found {q_type}: {answer['data']}")
-                else:
-                    print(f"    No {q_type} records found for {domain}.")
-            except httpx.RequestError as e:
-                print(f"  Error fetching {q_type} record for {domain}: {e}. (Is {cloudflare_doh} reachable?)")
-            except json.JSONDecodeError:
-                print(f"  JSON decode error from {cloudflare_doh} for {domain}. Response was not valid JSON or empty.")
-            except Exception as e:
-                print(f"  An unexpected error during {q_type} lookup for {domain}: {e}")
+    query_types = ["A", "AAAA", "MX", "NS", "TXT", "CNAME", "SOA"]
+    results = await asyncio.gather(*[_query(client, domain, q_type) for q_type in query_types])
+
+    for q_type, answers in results:
+        if answers is None:
+            continue
+        if not answers:
+            logger.debug("No %s records found for %s.", q_type, domain)
+            continue
+        for answer in answers:
+            if q_type == "SOA":
+                records["SOA"] = answer["data"]
+                logger.debug("Found SOA: %s", answer['data'])
+            elif q_type == "CNAME":
+                records["CNAME"].append({"name": answer["name"], "target": answer["data"]})
+                logger.debug("Found CNAME: %s -> %s", answer['name'], answer['data'])
+            else:
+                records[q_type].append(answer["data"])
+                logger.debug("Found %s: %s", q_type, answer['data'])
     
     return records
 
-async def discover_subdomains_crtsh(domain: str) -> List[str]:
+async def discover_subdomains_crtsh(domain: str, client: httpx.AsyncClient = CLIENT) -> List[str]:
     """
     Discovers subdomains using Certificate Transparency logs via crt.sh.
     """
     subdomains = set()
-    print(f"  Attempting to discover subdomains from crt.sh for {domain}...")
+    logger.debug("Attempting to discover subdomains from crt.sh for %s...", domain)
+    # One name per line: the domain itself or any subdomain, with an optional wildcard prefix
+    san_re = re.compile(
+        rf'^\s*(?:\*\.)?((?:[a-z0-9_-]+\.)*{re.escape(domain)})\s*$',
+        re.IGNORECASE | re.MULTILINE
+    )
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"https://crt.sh/?q=%25.{domain}&output=json",
-                timeout=45.0 # crt.sh can be very slow
-            )
+        # Stream the (potentially huge) certificate list and parse it incrementally
+        certs = ijson.sendable_list()
+        parser = ijson.items_coro(certs, 'item')
+        cert_count = 0
+        async with client.stream(
+            'GET',
+            f"https://crt.sh/?q=%25.{domain}&output=json",
+            timeout=45.0 # crt.sh can be very slow
+        ) as response:
             response.raise_for_status()
-            certs = response.json()
-            if not certs:
-                print(f"    crt.sh returned no certificates for %%.{domain}.")
-            for cert in certs:
-                if 'common_name' in cert:
-                    cn = cert['common_name']
-                    if cn.endswith(f".{domain}") or cn == domain:
-                        if cn.startswith('*.') and cn != domain: # Handle wildcard entries
-                            subdomains.add(cn.lower().replace('*.', ''))
-                        else:
-                            subdomains.add(cn.lower())
-                if 'name_value' in cert:
-                    names = cert['name_value'].split('\n')
-                    for name in names:
-                        name = name.strip()
-                        if name.startswith('*.') and name.endswith(f".{domain}"):
-                            subdomains.add(name.lower().replace('*.', ''))
-                        elif name.endswith(f".{domain}") or name == domain:
-                            subdomains.add(name.lower())
-            print(f"  Discovered {len(subdomains)} subdomains from crt.sh.")
+            async for chunk in response.aiter_bytes():
+                parser.send(chunk)
+                for cert in certs:
+                    subdomains.update(m.lower() for m in san_re.findall(cert.get('common_name') or ''))
+                    subdomains.update(m.lower() for m in san_re.findall(cert.get('name_value') or ''))
+                cert_count += len(certs)
+                del certs[:]
+        parser.close()
+        if not cert_count:
+            logger.debug("crt.sh returned no certificates for %%.%s.", domain)
+        logger.debug("Discovered %s subdomains from crt.sh.", len(subdomains))
     except httpx.RequestError as e:
-        print(f"  Error fetching subdomains from crt.sh for {domain}: {e}. (Is crt.sh reachable?)")
-    except json.JSONDecodeError:
-        print(f"  JSON decode error from crt.sh for {domain}. Response was not valid JSON or empty.")
+        logger.warning("Error fetching subdomains from crt.sh for %s: %s. (Is crt.sh reachable?)", domain, e)
+    except ijson.JSONError:
+        logger.warning("JSON decode error from crt.sh for %s. Response was not valid JSON or empty.", domain)
     except Exception as e:
-        print(f"  An unexpected error during crt.sh subdomain discovery for {domain}: {e}")
+        logger.warning("An unexpected error during crt.sh subdomain discovery for %s: %s", domain, e)
     
     return list(subdomains)
 
+async def _reverse_lookup(ip_address: str) -> Optional[str]:
+    """Runs one PTR lookup and caches the hostname if it succeeds."""
+    try:
+        result = await get_resolver().gethostbyaddr(ip_address)
+        hostname = result.name
+        logger.debug("Reverse DNS lookup for %s found: %s", ip_address, hostname)
+    except aiodns.error.DNSError as e:
+        return None
+    except Exception as e:
+        logger.warning("An unexpected error during reverse DNS lookup for %s: %s", ip_address, e)
+        return None
+    _PTR_CACHE[ip_address] = (hostname, time.monotonic())
+    _PTR_CACHE.move_to_end(ip_address)
+    while len(_PTR_CACHE) > PTR_CACHE_MAXSIZE:
+        _PTR_CACHE.popitem(last=False)
+    return hostname
+
 async def perform_reverse_dns_lookup(ip_address: str) -> Optional[str]:
     """
     Performs a reverse DNS lookup (IP to domain name).
+    Hostnames are cached for PTR_CACHE_TTL seconds, since many hosts commonly
+    share the same IPs, and concurrent lookups of one IP share a single query.
+    Failures are not cached, so a timeout or SERVFAIL is retried on the next call.
+    """
+    entry = _PTR_CACHE.get(ip_address)
+    if entry is not None:
+        hostname, fetched_at = entry
+        if time.monotonic() - fetched_at < PTR_CACHE_TTL:
+            _PTR_CACHE.move_to_end(ip_address)
+            return hostname
+        del _PTR_CACHE[ip_address]
+
+    task = _PTR_INFLIGHT.get(ip_address)
+    # A task left over from another (possibly closed) event loop cannot be awaited here
+    if task is None or task.get_loop() is not asyncio.get_running_loop():
+        task = asyncio.create_task(_reverse_lookup(ip_address))
+        _PTR_INFLIGHT[ip_address] = task
+        task.add_done_callback(
+            lambda done: _PTR_INFLIGHT.pop(ip_address, None) if _PTR_INFLIGHT.get(ip_address) is done else None
+        )
+    # Shielded so one caller being cancelled does not cancel the lookup for the others
+    return await asyncio.shield(task)
+
+async def resolve_domain_to_ip(domain: str) -> Optional[str]:
+    """
+    Resolves a domain name to its first IPv4 address.
+    Queries DNS directly through c-ares, so unlike the system resolver this
+    does not consult /etc/hosts.
     """
     try:
-        # Use a non-blocking way to perform reverse DNS
-        hostname, _, _ = await asyncio.to_thread(socket.gethostbyaddr, ip_address)
-        print(f"  Reverse DNS lookup for {ip_address} found: {hostname}")
-        return hostname
-    except (socket.herror, socket.gaierror) as e:
+        result = await get_resolver().query_dns(domain, 'A')
+        # The answer section can start with the CNAME chain; take the first A record
+        for record in result.answer:
+            if record.type == pycares.QUERY_TYPE_A:
+                return record.data.addr
+        return None
+    except aiodns.error.DNSError as e:
         return None
     except Exception as e:
-        print(f"  An unexpected error during reverse DNS lookup for {ip_address}: {e}")
+        logger.warning("An unexpected error during DNS resolution for %s: %s", domain, e)
         return None
 
-async def run_dns_enum(domain: str) -> Dict[str, Any]:
+async def run_dns_enum(domain: str, client: httpx.AsyncClient = CLIENT) -> Dict[str, Any]:
     """
     Performs DNS enumeration for a given domain, including record lookups
     and subdomain discovery, and returns data suitable for graph visualization.
     """
     domain = domain.lower().strip()
     
-    print(f"Starting DNS enumeration for domain: {domain}")
+    logger.info("Starting DNS enumeration for domain: %s", domain)
 
     nodes = []
     links = []
@@ -173,61 +303,39 @@ async def run_dns_enum(domain: str) -> Dict[str, Any]:
         return node_map[normalized_value]
 
     main_domain_id = add_node("domain", domain, label=domain)
-    print(f"Added main domain node: {domain} (ID: {main_domain_id})")
+    logger.debug("Added main domain node: %s (ID: %s)", domain, main_domain_id)
+
+    main_dns_records = await get_dns_records(domain, client)
+    logger.debug("Main DNS records for %s fetched: %s", domain, main_dns_records)
 
-    main_dns_records = await get_dns_records(domain)
-    print(f"Main DNS records for {domain} fetched: {main_dns_records}")
+    # Hosts to resolve as (node_id, host, label, known_ip, with_ptr). All of them
+    # are resolved in one concurrent pass once the graph skeleton is built.
+    targets = []
 
     for ip in main_dns_records["A"]:
-        ip_id = add_node("ip_v4", ip)
-        links.append({"source": main_domain_id, "target": ip_id, "type": "A_record"})
-        print(f"  Linked {domain} (A) to IP {ip}")
-        hostname = await perform_reverse_dns_lookup(ip)
-        if hostname and hostname.lower() != domain:
-            hostname_id = add_node("domain", hostname)
-            links.append({"source": ip_id, "target": hostname_id, "type": "PTR_record"})
-            print(f"    Linked IP {ip} (PTR) to domain {hostname}")
+        targets.append((main_domain_id, domain, "domain", ip, True))
 
     for ip in main_dns_records["AAAA"]:
         ip_id = add_node("ip_v6", ip)
         links.append({"source": main_domain_id, "target": ip_id, "type": "AAAA_record"})
-        print(f"  Linked {domain} (AAAA) to IP {ip}")
+        logger.debug("Linked %s (AAAA) to IP %s", domain, ip)
 
     for mx_record in main_dns_records["MX"]:
-        mx_hostname_match = re.match(r'\d+\s+(.*)', mx_record)
+        mx_hostname_match = MX_RE.match(mx_record)
         mx_hostname = mx_hostname_match.group(1).strip('.') if mx_hostname_match else mx_record.strip('.')
         mx_hostname = mx_hostname.lower()
 
         mx_id = add_node("mail_server", mx_hostname)
         links.append({"source": main_domain_id, "target": mx_id, "type": "MX_record"})
-        print(f"  Linked {domain} (MX) to mail server {mx_hostname}")
-        mx_ip = await run_port_scan_resolve_domain_to_ip(mx_hostname)
-        if mx_ip:
-            mx_ip_id = add_node("ip_v4", mx_ip)
-            links.append({"source": mx_id, "target": mx_ip_id, "type": "A_record"})
-            print(f"    Linked mail server {mx_hostname} (A) to IP {mx_ip}")
-            hostname = await perform_reverse_dns_lookup(mx_ip)
-            if hostname and hostname.lower() != mx_hostname:
-                hostname_id = add_node("domain", hostname)
-                links.append({"source": mx_ip_id, "target": hostname_id, "type": "PTR_record"})
-                print(f"      Linked IP {mx_ip} (PTR) to domain {hostname}")
-
+        logger.debug("Linked %s (MX) to mail server %s", domain, mx_hostname)
+        targets.append((mx_id, mx_hostname, "mail server", None, True))
 
     for ns_record in main_dns_records["NS"]:
         ns_hostname = ns_record.strip('.').lower()
         ns_id = add_node("name_server", ns_hostname)
         links.append({"source": main_domain_id, "target": ns_id, "type": "NS_record"})
-        print(f"  Linked {domain} (NS) to name server {ns_hostname}")
-        ns_ip = await run_port_scan_resolve_domain_to_ip(ns_hostname)
-        if ns_ip:
-            ns_ip_id = add_node("ip_v4", ns_ip)
-            links.append({"source": ns_id, "target": ns_ip_id, "type": "A_record"})
-            print(f"    Linked name server {ns_hostname} (A) to IP {ns_ip}")
-            hostname = await perform_reverse_dns_lookup(ns_ip)
-            if hostname and hostname.lower() != ns_hostname:
-                hostname_id = add_node("domain", hostname)
-                links.append({"source": ns_ip_id, "target": hostname_id, "type": "PTR_record"})
-                print(f"      Linked IP {ns_ip} (PTR) to domain {hostname}")
+        logger.debug("Linked %s (NS) to name server %s", domain, ns_hostname)
+        targets.append((ns_id, ns_hostname, "name server", None, True))
 
 
     if main_dns_records["TXT"]:
@@ -235,7 +343,7 @@ async def run_dns_enum(domain: str) -> Dict[str, Any]:
         for node in nodes:
             if node["id"] == main_domain_id:
                 node["txt_records"] = txt_data
-                print(f"  Added TXT records to main domain node.")
+                logger.debug("Added TXT records to main domain node.")
                 break
 
     for cname_entry in main_dns_records["CNAME"]:
@@ -246,64 +354,79 @@ async def run_dns_enum(domain: str) -> Dict[str, Any]:
         cname_target_id = add_node("domain", cname_target)
         
         links.append({"source": cname_origin_id, "target": cname_target_id, "type": "CNAME_record"})
-        print(f"  Linked {cname_name} (CNAME) to {cname_target}")
+        logger.debug("Linked %s (CNAME) to %s", cname_name, cname_target)
         
         if cname_name == domain:
             links.append({"source": main_domain_id, "target": cname_origin_id, "type": "CNAME_alias"})
-            print(f"    Added CNAME alias link from {domain} to {cname_name}")
+            logger.debug("Added CNAME alias link from %s to %s", domain, cname_name)
 
-        cname_target_ip = await run_port_scan_resolve_domain_to_ip(cname_target)
-        if cname_target_ip:
-            cname_target_ip_id = add_node("ip_v4", cname_target_ip)
-            links.append({"source": cname_target_id, "target": cname_target_ip_id, "type": "A_record"})
-            print(f"    Linked CNAME target {cname_target} (A) to IP {cname_target_ip}")
+        targets.append((cname_target_id, cname_target, "CNAME target", None, False))
 
 
-    print(f"Starting subdomain discovery for: {domain}")
-    discovered_subdomains = set()
+    logger.debug("Starting subdomain discovery for: %s", domain)
+    # Maps each discovered subdomain to its IP, or None if it still needs resolving
+    discovered_subdomains: Dict[str, Optional[str]] = {}
+
+    # Wordlist guesses are only kept if they actually resolve. Probe them while crt.sh is queried.
+    candidates = [f"{sub}.{domain}" for sub in COMMON_SUBDOMAINS if normalizeDomainForDNS(f"{sub}.{domain}")]
+    probes, crtsh_subdomains = await asyncio.gather(
+        asyncio.gather(*[resolve_domain_to_ip(candidate) for candidate in candidates]),
+        discover_subdomains_crtsh(domain, client),
+    )
+    for candidate, ip in zip(candidates, probes):
+        if ip:
+            discovered_subdomains[candidate] = ip
 
-    for sub in COMMON_SUBDOMAINS:
-        full_subdomain = f"{sub}.{domain}"
-        if normalizeDomainForDNS(full_subdomain):
-            discovered_subdomains.add(full_subdomain)
-    
-    crtsh_subdomains = await discover_subdomains_crtsh(domain)
     for sub in crtsh_subdomains:
-        if sub != domain:
+        if sub != domain and sub not in discovered_subdomains:
             if normalizeDomainForDNS(sub):
-                discovered_subdomains.add(sub)
-            
-    for subdomain in discovered_subdomains:
+                discovered_subdomains[sub] = None
+
+    for subdomain, sub_ip in discovered_subdomains.items():
         if subdomain != domain:
             subdomain_id = add_node("subdomain", subdomain)
             links.append({"source": main_domain_id, "target": subdomain_id, "type": "has_subdomain"})
-            print(f"  Linked main domain to discovered subdomain: {subdomain}")
-
-            sub_ip = await run_port_scan_resolve_domain_to_ip(subdomain)
-            if sub_ip:
-                sub_ip_id = add_node("ip_v4", sub_ip)
-                links.append({"source": subdomain_id, "target": sub_ip_id, "type": "A_record"})
-                print(f"    Linked subdomain {subdomain} (A) to IP {sub_ip}")
-                hostname = await perform_reverse_dns_lookup(sub_ip)
-                if hostname and hostname.lower() != subdomain:
-                    hostname_id = add_node("domain", hostname)
-                    links.append({"source": sub_ip_id, "target": hostname_id, "type": "PTR_record"})
-                    print(f"      Linked IP {sub_ip} (PTR) to domain {hostname}")
-            
-            await asyncio.sleep(0.05)
+            logger.debug("Linked main domain to discovered subdomain: %s", subdomain)
+            targets.append((subdomain_id, subdomain, "subdomain", sub_ip, True))
+
+    sem = asyncio.Semaphore(RESOLVE_CONCURRENCY)
+
+    async def resolve_and_link(host_id: int, host: str, label: str, ip: Optional[str], with_ptr: bool):
+        """Runs the forward (unless the IP is already known) and PTR lookups for one host."""
+        async with sem:
+            if ip is None:
+                ip = await resolve_domain_to_ip(host)
+            ptr_host = await perform_reverse_dns_lookup(ip) if ip and with_ptr else None
+        return host_id, host, label, ip, ptr_host
+
+    # Lookups run concurrently; graph mutation stays sequential below.
+    results = await asyncio.gather(*[resolve_and_link(*target) for target in targets])
+    for host_id, host, label, ip, ptr_host in results:
+        if not ip:
+            continue
+        ip_id = add_node("ip_v4", ip)
+        links.append({"source": host_id, "target": ip_id, "type": "A_record"})
+        logger.debug("Linked %s %s (A) to IP %s", label, host, ip)
+        if ptr_host and ptr_host.lower() != host:
+            ptr_host_id = add_node("domain", ptr_host)
+            links.append({"source": ip_id, "target": ptr_host_id, "type": "PTR_record"})
+            logger.debug("Linked IP %s (PTR) to domain %s", ip, ptr_host)
 
     graph_data = {
         "nodes": nodes,
         "links": links
     }
-    print(f"DNS enumeration completed for {domain}. Found {len(nodes)} nodes and {len(links)} links.")
+    logger.info("DNS enumeration completed for %s. Found %s nodes and %s links.", domain, len(nodes), len(links))
     
     return graph_data
 
 async def main():
     """Example usage of the run_dns_enum function."""
     print("Running DNS enumeration for 'google.com'...")
-    results = await run_dns_enum("google.com")
+    try:
+        results = await run_dns_enum("google.com")
+    finally:
+        await CLIENT.aclose()
     print("\n--- DNS Enumeration Results ---")
     print(f"Found {len(results['nodes'])} nodes.")
     print(f"Found {len(results['links'])} links.")
@@ -318,4 +441,5 @@ async def main():
     print("--------------------")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     asyncio.run(main())
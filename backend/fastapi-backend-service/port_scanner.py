@@ -1,12 +1,31 @@
-import re
+import copy
+import time
+import errno
+import logging
+import socket
+import struct
+import selectors
 import asyncio
 import httpx
-from typing import Dict, List, Any, Optional
+import orjson
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from ipaddress import ip_address
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Any, Mapping, Optional, Tuple
+
+try:
+    import uvloop
+except ImportError:  # Optional: fall back to the stock asyncio event loop
+    uvloop = None
 
 # ==========================================================
 # Port Scanning Feature
 # ==========================================================
 
+logger = logging.getLogger(__name__)
+
 # All external API sources have been commented out.
 # SCAN_SOURCES = {
 #     "HACKERTARGET": 'https://api.hackertarget.com/nmap/?q=',
@@ -14,135 +33,463 @@ from typing import Dict, List, Any, Optional
 #     "WEBHACK": 'https://webhack.io/nmap-api?target='
 # }
 
+# In-process DNS answer cache: domain -> (ip, fetched_at, ttl), timed on the
+# monotonic clock. Kept in LRU order and bounded by DNS_CACHE_MAXSIZE.
+# Filled by both the system resolver and DoH lookups.
+# Stale-while-revalidate: once an entry is DNS_REFRESH_FRACTION through its TTL
+# it is refreshed in the background, and it keeps being served until
+# DNS_STALE_GRACE seconds past expiry so callers never wait on the refresh.
+DNS_CACHE_MAXSIZE = 1024
+DNS_DEFAULT_TTL = 300
+DNS_REFRESH_FRACTION = 0.8
+DNS_STALE_GRACE = 60
+_DNS_CACHE: "OrderedDict[str, Tuple[str, float, float]]" = OrderedDict()
+_DNS_REFRESHES: Dict[str, asyncio.Task] = {}
+
+def _dns_cache_get(domain: str) -> Optional[str]:
+    """
+    Returns the cached IP for a domain, or None if missing or too stale to use.
+    Starts a background refresh when the entry is close to (or past) expiry.
+    """
+    entry = _DNS_CACHE.get(domain)
+    if entry is None:
+        return None
+    ip, fetched_at, ttl = entry
+    age = time.monotonic() - fetched_at
+    if age >= ttl + DNS_STALE_GRACE:
+        del _DNS_CACHE[domain]
+        return None
+    _DNS_CACHE.move_to_end(domain)
+    if age > DNS_REFRESH_FRACTION * ttl and domain not in _DNS_REFRESHES:
+        task = asyncio.create_task(_resolve_uncached(domain))
+        _DNS_REFRESHES[domain] = task
+        task.add_done_callback(lambda _: _DNS_REFRESHES.pop(domain, None))
+    return ip
+
+def _dns_cache_put(domain: str, ip: str, ttl: float) -> None:
+    # No lock needed: nothing here awaits, so it runs without interleaving on the loop
+    _DNS_CACHE[domain] = (ip, time.monotonic(), ttl)
+    _DNS_CACHE.move_to_end(domain)
+    while len(_DNS_CACHE) > DNS_CACHE_MAXSIZE:
+        _DNS_CACHE.popitem(last=False)
+
+def invalidate_dns_cache(domain: Optional[str] = None) -> None:
+    """Drops the cached resolution for a domain, or the whole cache if no domain is given."""
+    if domain is None:
+        _DNS_CACHE.clear()
+    else:
+        _DNS_CACHE.pop(domain, None)
+
+# DoH JSON endpoints queried in parallel; the first A record returned wins
+DOH_ENDPOINTS = (
+    "https://cloudflare-dns.com/dns-query",
+    "https://dns.google/resolve",
+)
+DOH_HEDGE_TIMEOUT = 5
+
+# Shared DoH client, created on first use so successive lookups reuse the
+# pooled HTTP/2 connections to the DoH resolvers.
+_DOH_CLIENT: Optional[httpx.AsyncClient] = None
+
+def _get_doh_client() -> httpx.AsyncClient:
+    # No lock needed: nothing awaits between the check and the assignment
+    global _DOH_CLIENT
+    if _DOH_CLIENT is None:
+        _DOH_CLIENT = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=10),
+            timeout=10.0, # Increased timeout for DNS resolution
+            headers={'accept': 'application/dns-json'},
+        )
+    return _DOH_CLIENT
+
+async def close_doh_client() -> None:
+    """Closes the shared DoH client. Call on application shutdown."""
+    global _DOH_CLIENT
+    if _DOH_CLIENT is not None:
+        await _DOH_CLIENT.aclose()
+        _DOH_CLIENT = None
+
+def is_valid_ip_address(ip: str) -> bool:
+    """Helper to check if a string is a valid IPv4 or IPv6 address."""
+    try:
+        ip_address(ip)
+        return True
+    except ValueError:
+        return False
+
 def is_valid_ipv4_address(ip: str) -> bool:
     """Helper to check if a string is a valid IPv4 address."""
-    return bool(re.match(r'^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}$', ip))
+    return is_valid_ip_address(ip) and ip_address(ip).version == 4
 
-async def resolve_domain_to_ip(domain: str) -> Optional[str]:
-    """Resolves a domain name to an IP address using Cloudflare DNS over HTTPS."""
-    if is_valid_ipv4_address(domain):
-        return domain
+@lru_cache(maxsize=1024)
+def _address_family(ip: str) -> int:
+    """Returns the socket family (AF_INET or AF_INET6) to connect to an IP address with."""
+    return socket.AF_INET6 if ip_address(ip).version == 6 else socket.AF_INET
 
+async def _doh_query(url: str, domain: str) -> Optional[Tuple[str, float]]:
+    """Queries one DoH JSON endpoint for a domain's A record. Returns (ip, ttl) or None."""
     try:
-        async with httpx.AsyncClient() as client:
-            # Increased timeout for DNS resolution
-            dns_response = await client.get(
-                f"https://cloudflare-dns.com/dns-query?name={domain}&type=A",
-                headers={'accept': 'application/dns-json'},
-                timeout=10.0 # Increased timeout
-            )
+        client = _get_doh_client()
+        dns_response = await client.get(url, params={"name": domain, "type": "A"})
+        if dns_response.status_code != 200:
             dns_response.raise_for_status()
-            dns_data = dns_response.json()
-            if dns_data and dns_data.get('Answer') and len(dns_data['Answer']) > 0:
-                ip = dns_data['Answer'][0]['data']
-                print(f"Resolved {domain} to IP: {ip}")
-                return ip
-            print(f"DNS resolution found no A records for {domain}.")
-            return None
+        # Skip CNAMEs in the chain and take the first A record (type 1)
+        for answer in orjson.loads(dns_response.content).get('Answer', ()):
+            if answer['type'] == 1:
+                return answer['data'], answer.get('TTL', DNS_DEFAULT_TTL)
+        logger.debug("DNS resolution via %s found no A records for %s.", url, domain)
+        return None
     except httpx.HTTPStatusError as e:
-        print(f"DNS resolution HTTP error for {domain}: {e.response.status_code} - {e.response.text}")
+        logger.warning("DNS resolution HTTP error for %s via %s: %s - %s", domain, url, e.response.status_code, e.response.text)
         return None
     except httpx.RequestError as e:
-        print(f"DNS resolution request error for {domain}: {e}")
+        logger.warning("DNS resolution request error for %s via %s: %s", domain, url, e)
         return None
     except Exception as e:
-        print(f"An unexpected error occurred during DNS resolution for {domain}: {e}")
+        logger.warning("An unexpected error occurred during DNS resolution for %s via %s: %s", domain, url, e)
         return None
 
-async def check_single_port_python(ip: str, port: int, timeout: float = 2.0) -> Dict[str, Any]:
-    """Checks if a single TCP port is open."""
+async def _doh_resolve(domain: str) -> Optional[str]:
+    """
+    Races the query against every DOH_ENDPOINTS resolver and caches the first A
+    record returned. The slower queries are cancelled.
+    """
+    tasks = [asyncio.create_task(_doh_query(url, domain)) for url in DOH_ENDPOINTS]
+    deadline = time.monotonic() + DOH_HEDGE_TIMEOUT
+    pending = set(tasks)
     try:
-        _, writer = await asyncio.wait_for(
-            asyncio.open_connection(ip, port),
-            timeout=timeout
-        )
-        writer.close()
-        await writer.wait_closed()
-        print(f"Port {port} on {ip} is OPEN (local check).")
-        return {"port": port, "open": True}
-    except (asyncio.TimeoutError, ConnectionRefusedError, OSError) as e:
-        return {"port": port, "open": False}
-    except Exception as e:
-        print(f"Error checking port {port} on {ip}: {e}")
-        return {"port": port, "open": False}
-
-async def local_port_check_python(ip: str) -> Dict[str, Any]:
-    """Performs a local TCP port scan on common ports."""
-    common_ports = [
-        21, 22, 23, 25, 53, 80, 110, 143,
-        443, 465, 587, 993, 995, 3306, 3389,
-        8080, 8443
-    ]
-    print(f"Starting local port check for IP: {ip} on common ports.")
-
-    # Run checks concurrently
-    results = await asyncio.gather(
-        *[check_single_port_python(ip, port) for port in common_ports]
-    )
-    
-    open_ports = [r['port'] for r in results if r['open']]
-    services = []
-    for r in results:
-        if r['open']:
-            port = r['port']
-            protocol = 'tcp'
-            service_name = 'unknown'
-            if port == 21: service_name = 'ftp'
-            elif port == 22: service_name = 'ssh'
-            elif port == 23: service_name = 'telnet'
-            elif port == 25: service_name = 'smtp'
-            elif port == 53: service_name = 'dns'
-            elif port == 80: service_name = 'http'; protocol = 'http'
-            elif port == 110: service_name = 'pop3'
-            elif port == 143: service_name = 'imap'
-            elif port == 443: service_name = 'https'; protocol = 'https'
-            elif port == 465: service_name = 'smtps'; protocol = 'ssl/tls'
-            elif port == 587: service_name = 'submission'; protocol = 'smtp'
-            elif port == 993: service_name = 'imaps'; protocol = 'ssl/tls'
-            elif port == 995: service_name = 'pop3s'; protocol = 'ssl/tls'
-            elif port == 3306: service_name = 'mysql'
-            elif port == 3389: service_name = 'rdp'
-            elif port == 8080: service_name = 'http-alt'; protocol = 'http'
-            elif port == 8443: service_name = 'https-alt'; protocol = 'https'
-            services.append({"port": port, "protocol": protocol, "service": service_name})
-
-    print(f"Local port check completed for {ip}. Found {len(open_ports)} open ports.")
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, timeout=deadline - time.monotonic(), return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                logger.warning("DNS resolution timed out for %s.", domain)
+                return None
+            for task in done:
+                answer = task.result()
+                if answer:
+                    ip, ttl = answer
+                    _dns_cache_put(domain, ip, ttl)
+                    logger.debug("Resolved %s to IP: %s", domain, ip)
+                    return ip
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def _system_resolve(domain: str) -> Optional[str]:
+    """
+    Resolves a domain's IPv4 address through the OS stub resolver (/etc/hosts and
+    any local cache) and caches the answer. Returns None if the lookup fails.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        infos = await loop.getaddrinfo(domain, None, family=socket.AF_INET, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError) as e:
+        # UnicodeError: the idna codec rejects malformed names such as empty labels
+        logger.debug("System resolver failed for %s: %s", domain, e)
+        return None
+    if not infos:
+        return None
+    ip = infos[0][4][0]
+    # getaddrinfo does not expose the record TTL
+    _dns_cache_put(domain, ip, DNS_DEFAULT_TTL)
+    logger.debug("Resolved %s to IP: %s (system resolver)", domain, ip)
+    return ip
+
+async def _resolve_uncached(domain: str) -> Optional[str]:
+    """Tries the system resolver first and falls back to DoH."""
+    ip = await _system_resolve(domain)
+    if ip:
+        return ip
+    return await _doh_resolve(domain)
+
+async def resolve_domain_to_ip(domain: str) -> Optional[str]:
+    """
+    Resolves a domain name to an IP address, using the system resolver first and
+    DNS over HTTPS (Cloudflare and Google in parallel) as a fallback.
+    Answers are cached and refreshed in the background.
+    """
+    # IP literals (including IPv6, which an A-record lookup cannot answer) need no lookup
+    if is_valid_ip_address(domain):
+        return domain
+
+    cached_ip = _dns_cache_get(domain)
+    if cached_ip:
+        logger.debug("Resolved %s to IP: %s (cached)", domain, cached_ip)
+        return cached_ip
+
+    return await _resolve_uncached(domain)
+
+# SO_LINGER {l_onoff=1, l_linger=0}: close() resets the connection immediately
+_LINGER_RST = struct.pack('ii', 1, 0)
+
+# connect() errors that suggest packet loss rather than a closed port
+_RETRY_ERRNOS = (errno.EHOSTUNREACH, errno.ENETUNREACH)
+
+# Well-known port -> (service name, protocol)
+_PORT_SERVICE: Mapping[int, Tuple[str, str]] = MappingProxyType({
+    21: ('ftp', 'tcp'),
+    22: ('ssh', 'tcp'),
+    23: ('telnet', 'tcp'),
+    25: ('smtp', 'tcp'),
+    53: ('dns', 'tcp'),
+    80: ('http', 'http'),
+    110: ('pop3', 'tcp'),
+    143: ('imap', 'tcp'),
+    443: ('https', 'https'),
+    465: ('smtps', 'ssl/tls'),
+    587: ('submission', 'smtp'),
+    993: ('imaps', 'ssl/tls'),
+    995: ('pop3s', 'ssl/tls'),
+    3306: ('mysql', 'tcp'),
+    3389: ('rdp', 'tcp'),
+    8080: ('http-alt', 'http'),
+    8443: ('https-alt', 'https'),
+})
+
+# Ports open on most live hosts. With early_exit these are probed first, as their
+# own wave, so a scan that only needs a few open ports can stop before the rest.
+FIRST_WAVE_PORTS: Tuple[int, ...] = (443, 80, 22)
+
+# Default ports to scan
+COMMON_PORTS: Tuple[int, ...] = (
+    443, 80, 22, 8080, 8443, 25, 21, 3389, 3306,
+    53, 587, 993, 143, 110, 465, 995, 23,
+)
+
+@dataclass(slots=True, frozen=True)
+class PortService:
+    """An open port found by a scan."""
+    port: int
+    protocol: str
+    service: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"port": self.port, "protocol": self.protocol, "service": self.service}
+
+# Upper bound on simultaneous connection attempts, to stay well clear of FD limits
+PORT_CHECK_CONCURRENCY = 256
+
+# Full scans of at least this many ports go through fast_port_scan
+FAST_SCAN_MIN_PORTS = 100
+
+async def check_single_port_python(ip: str, port: int, connect_timeout: float = 0.5,
+                                   retries: int = 2) -> Optional[PortService]:
+    """
+    Checks if a single TCP port is open with a bare non-blocking connect.
+    Returns a PortService if it is open, or None if it is closed or filtered.
+    A refused connection returns immediately; only errors that point to packet loss
+    (host/network unreachable) are retried, with the backoff doubling each time.
+    """
+    loop = asyncio.get_running_loop()
+    family = _address_family(ip)
+    backoff = connect_timeout
+    for attempt in range(retries + 1):
+        try:
+            sock = socket.socket(family, socket.SOCK_STREAM)
+        except OSError as e:
+            # e.g. EMFILE; report the port as not open rather than failing the whole scan
+            logger.warning("Could not open a socket to check port %s on %s: %s", port, ip, e)
+            return None
+        try:
+            sock.setblocking(False)
+            # Close with RST instead of a FIN handshake; we never send any data
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, _LINGER_RST)
+            await asyncio.wait_for(loop.sock_connect(sock, (ip, port)), timeout=connect_timeout)
+            service_name, protocol = _PORT_SERVICE.get(port, ('unknown', 'tcp'))
+            return PortService(port, protocol, service_name)
+        except asyncio.TimeoutError:
+            return None
+        except OSError as e:
+            # Refused means closed; retry only on errors that suggest packet loss
+            if e.errno not in _RETRY_ERRNOS or attempt == retries:
+                return None
+        except Exception as e:
+            logger.warning("Error checking port %s on %s: %s", port, ip, e)
+            return None
+        finally:
+            sock.close()
+        await asyncio.sleep(backoff)
+        backoff *= 2
+    return None
+
+def fast_port_scan(ip: str, ports: Iterable[int], timeout: float = 0.5) -> List[PortService]:
+    """
+    Blocking port scan used by local_port_check_python for large port lists.
+    Starts every non-blocking connect at once and waits on them with a single
+    selector, so there is no per-port task overhead. Ports are handled in batches
+    of PORT_CHECK_CONCURRENCY sockets, each batch waiting at most `timeout` seconds.
+    Call through asyncio.to_thread() from async code.
+    """
+    ports = tuple(ports)
+    family = _address_family(ip)
+    found: List[PortService] = []
+    for start in range(0, len(ports), PORT_CHECK_CONCURRENCY):
+        with selectors.DefaultSelector() as sel:
+            socks = []
+            try:
+                for port in ports[start:start + PORT_CHECK_CONCURRENCY]:
+                    try:
+                        sock = socket.socket(family, socket.SOCK_STREAM)
+                    except OSError as e:
+                        logger.warning("Could not open a socket to check port %s on %s: %s", port, ip, e)
+                        continue
+                    socks.append(sock)
+                    sock.setblocking(False)
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, _LINGER_RST)
+                    err = sock.connect_ex((ip, port))
+                    if err in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+                        sel.register(sock, selectors.EVENT_WRITE, port)
+
+                # Writable means the handshake finished; SO_ERROR says whether it succeeded
+                deadline = time.monotonic() + timeout
+                while sel.get_map():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    for key, _ in sel.select(remaining):
+                        sel.unregister(key.fileobj)
+                        if key.fileobj.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0:
+                            service_name, protocol = _PORT_SERVICE.get(key.data, ('unknown', 'tcp'))
+                            found.append(PortService(key.data, protocol, service_name))
+            finally:
+                for sock in socks:
+                    sock.close()
+
+    found.sort(key=lambda service: service.port)
+    logger.debug("Fast port scan completed for %s. Found %s open ports.", ip, len(found))
+    return found
+
+# Recent scan results: (ip, ports, early_exit) -> (scanned_at, result), in LRU order
+SCAN_CACHE_TTL = 60
+SCAN_CACHE_MAXSIZE = 512
+_ScanKey = Tuple[str, Optional[Tuple[int, ...]], Optional[int]]
+_SCAN_CACHE: "OrderedDict[_ScanKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+def _scan_cache_get(key: _ScanKey) -> Optional[Dict[str, Any]]:
+    """Returns a copy of a cached scan result younger than SCAN_CACHE_TTL, or None."""
+    entry = _SCAN_CACHE.get(key)
+    if entry is None:
+        return None
+    scanned_at, result = entry
+    if time.monotonic() - scanned_at >= SCAN_CACHE_TTL:
+        del _SCAN_CACHE[key]
+        return None
+    _SCAN_CACHE.move_to_end(key)
+    return copy.deepcopy(result)
+
+def _scan_cache_put(key: _ScanKey, result: Dict[str, Any]) -> None:
+    _SCAN_CACHE[key] = (time.monotonic(), copy.deepcopy(result))
+    _SCAN_CACHE.move_to_end(key)
+    while len(_SCAN_CACHE) > SCAN_CACHE_MAXSIZE:
+        _SCAN_CACHE.popitem(last=False)
+
+def _port_check_result(ip: str, found: List[PortService]) -> Dict[str, Any]:
+    """Builds the local port check result from open ports sorted by port number."""
+    logger.info("Local port check completed for %s. Found %s open ports.", ip, len(found))
     return {
         "source": "local-check",
-        "ports": open_ports,
-        "services": services,
+        "ports": [service.port for service in found],
+        "services": found,
         "note": "Performed local check on common ports."
     }
 
-async def run_port_scan(target: str) -> Dict[str, Any]:
+async def local_port_check_python(ip: str, ports: Optional[Iterable[int]] = None,
+                                  early_exit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Performs a local TCP port scan on common ports, or on `ports` if given.
+    At most PORT_CHECK_CONCURRENCY connections are attempted at once.
+    If `early_exit` is set, FIRST_WAVE_PORTS are probed first and the scan stops
+    once that many open ports are found.
+    Scans of FAST_SCAN_MIN_PORTS or more ports without `early_exit` use fast_port_scan.
+    Open ports are returned under "services" as PortService objects.
+    """
+    if early_exit is not None and early_exit < 1:
+        raise ValueError(f"early_exit must be at least 1, got {early_exit}")
+    common_ports = COMMON_PORTS if ports is None else tuple(ports)
+    logger.debug("Starting local port check for IP: %s on %s ports.", ip, len(common_ports))
+
+    if early_exit is None and len(common_ports) >= FAST_SCAN_MIN_PORTS:
+        # Large full scans: one selector in a worker thread instead of a task per port
+        found = await asyncio.to_thread(fast_port_scan, ip, common_ports)
+        return _port_check_result(ip, found)
+
+    sem = asyncio.Semaphore(PORT_CHECK_CONCURRENCY)
+
+    async def _bound(port: int) -> Optional[PortService]:
+        async with sem:
+            return await check_single_port_python(ip, port)
+
+    # With early_exit, probe FIRST_WAVE_PORTS before the rest so a likely open
+    # port can end the scan early; otherwise everything goes in one wave.
+    if early_exit is None:
+        waves = [common_ports]
+    else:
+        waves = [
+            tuple(port for port in common_ports if port in FIRST_WAVE_PORTS),
+            tuple(port for port in common_ports if port not in FIRST_WAVE_PORTS),
+        ]
+
+    # Run each wave's checks concurrently, collecting open ports as each check finishes
+    found: List[PortService] = []
+    for wave in waves:
+        if early_exit is not None and len(found) >= early_exit:
+            break
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(_bound(port)) for port in wave]
+            for next_result in asyncio.as_completed(tasks):
+                result = await next_result
+                if result:
+                    found.append(result)
+                    if early_exit is not None and len(found) >= early_exit:
+                        for task in tasks:
+                            task.cancel()
+                        break
+
+    found.sort(key=lambda service: service.port)
+    return _port_check_result(ip, found)
+
+async def run_port_scan(target: str, ports: Optional[Iterable[int]] = None,
+                        early_exit: Optional[int] = None) -> Dict[str, Any]:
     """
     Receives a target (domain or IP) and performs a local port scan.
+    `ports` overrides the default list of common ports; `early_exit` stops the
+    scan once that many open ports are found.
     """
-    print(f"Port scan request received for target: {target}")
+    if early_exit is not None and early_exit < 1:
+        raise ValueError(f"early_exit must be at least 1, got {early_exit}")
+    logger.info("Port scan request received for target: %s", target)
 
     # 1. Resolve domain to IP if needed
     ip = target
-    if not is_valid_ipv4_address(target):
-        print(f"Attempting to resolve domain: {target}")
+    if not is_valid_ip_address(target):
+        logger.debug("Attempting to resolve domain: %s", target)
         resolved_ip = await resolve_domain_to_ip(target)
         if resolved_ip:
             ip = resolved_ip
-            print(f"Resolved {target} to IP: {ip}")
+            logger.debug("Resolved %s to IP: %s", target, ip)
         else:
             error_msg = (
                 f"Could not resolve domain '{target}' to IP. Scan cannot proceed."
             )
-            print(error_msg)
+            logger.warning(error_msg)
             return {
                 "status": "error",
                 "error": error_msg,
                 "note": "DNS resolution failed."
             }
     else:
-        print(f"Target is already an IP address: {ip}")
+        logger.debug("Target is already an IP address: %s", ip)
 
-    # Directly call the local port check
-    scan_result = await local_port_check_python(ip)
+    # Directly call the local port check, reusing a recent result for the same IP and ports
+    ports = tuple(ports) if ports is not None else None
+    cache_key = (ip, ports, early_exit)
+    scan_result = _scan_cache_get(cache_key)
+    if scan_result is None:
+        scan_result = await local_port_check_python(ip, ports, early_exit)
+        _scan_cache_put(cache_key, scan_result)
     final_note = scan_result.get('note', 'Scan completed')
 
     return {
@@ -151,7 +498,8 @@ async def run_port_scan(target: str) -> Dict[str, Any]:
         "ip": ip,
         "source": scan_result.get('source', 'local-check'),
         "ports": scan_result.get('ports', []),
-        "services": scan_result.get('services', []),
+        # Serialized to plain dicts here, where the result leaves the module as JSON
+        "services": [service.to_dict() for service in scan_result.get('services', [])],
         "note": final_note
     }
 
@@ -160,7 +508,10 @@ async def run_port_scan(target: str) -> Dict[str, Any]:
 async def main():
     """Example usage of the run_port_scan function."""
     print("Running port scan for 'scanme.nmap.org'...")
-    results = await run_port_scan("scanme.nmap.org")
+    try:
+        results = await run_port_scan("scanme.nmap.org")
+    finally:
+        await close_doh_client()
     print("\n--- Scan Results ---")
     print(f"Status: {results['status']}")
     print(f"Target: {results['target']} (IP: {results['ip']})")
@@ -178,4 +529,7 @@ async def main():
     print("--------------------")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    # libuv-backed loop when available; much cheaper per sock_connect than the selector loop
+    with asyncio.Runner(loop_factory=uvloop.new_event_loop if uvloop is not None else None) as runner:
+        runner.run(main())
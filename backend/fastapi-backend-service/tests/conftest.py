@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The service modules live at the service root (port_scanner, dns_enumerator)
+# and in the app package, so make both importable from the test run.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import warnings
+
+import aiodns
+import httpx
+import pycares
+import pytest
+
+import dns_enumerator
+
+
+class FakeResolver:
+    def __init__(self, answer=None, error=None):
+        self.answer = answer or []
+        self.error = error
+
+    async def query_dns(self, host, qtype):
+        if self.error:
+            raise self.error
+        return pycares.DNSResult(answer=self.answer, authority=[], additional=[])
+
+
+def _record(qtype, data):
+    return pycares.DNSRecord(name='www.example.com', type=qtype, record_class=1, ttl=300, data=data)
+
+
+def _resolve(monkeypatch, resolver, domain='www.example.com'):
+    monkeypatch.setattr(dns_enumerator, 'get_resolver', lambda: resolver)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', DeprecationWarning)
+        return asyncio.run(dns_enumerator.resolve_domain_to_ip(domain))
+
+
+def test_resolve_skips_cname_chain(monkeypatch):
+    resolver = FakeResolver([
+        _record(pycares.QUERY_TYPE_CNAME, pycares.CNAMERecordData(cname='example.com')),
+        _record(pycares.QUERY_TYPE_A, pycares.ARecordData(addr='93.184.216.34')),
+    ])
+    assert _resolve(monkeypatch, resolver) == '93.184.216.34'
+
+
+def test_resolve_returns_none_without_a_records(monkeypatch):
+    assert _resolve(monkeypatch, FakeResolver()) is None
+
+
+def test_resolve_returns_none_on_dns_error(monkeypatch):
+    resolver = FakeResolver(error=aiodns.error.DNSError(4, 'Domain name not found'))
+    assert _resolve(monkeypatch, resolver) is None
+
+
+def test_resolver_follows_the_running_loop():
+    async def get():
+        first, second = dns_enumerator.get_resolver(), dns_enumerator.get_resolver()
+        assert first is second
+        return first
+
+    assert asyncio.run(get()) is not asyncio.run(get())
+
+
+class FakeReverseResolver:
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    async def gethostbyaddr(self, ip):
+        self.calls += 1
+        await asyncio.sleep(0)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return pycares.HostResult(name=outcome, aliases=[], addresses=[ip])
+
+
+@pytest.fixture
+def reverse_resolver(monkeypatch):
+    dns_enumerator._PTR_CACHE.clear()
+
+    def install(*outcomes):
+        resolver = FakeReverseResolver(*outcomes)
+        monkeypatch.setattr(dns_enumerator, 'get_resolver', lambda: resolver)
+        return resolver
+
+    yield install
+    dns_enumerator._PTR_CACHE.clear()
+
+
+def test_reverse_lookup_failures_are_not_cached(reverse_resolver):
+    resolver = reverse_resolver(aiodns.error.DNSError(12, 'Timeout while contacting DNS servers'), 'host.example.com')
+    assert asyncio.run(dns_enumerator.perform_reverse_dns_lookup('192.0.2.1')) is None
+    assert asyncio.run(dns_enumerator.perform_reverse_dns_lookup('192.0.2.1')) == 'host.example.com'
+    # Served from the cache, in yet another event loop
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        assert asyncio.run(dns_enumerator.perform_reverse_dns_lookup('192.0.2.1')) == 'host.example.com'
+    assert resolver.calls == 2
+
+
+def test_reverse_lookup_cache_expires(reverse_resolver, monkeypatch):
+    resolver = reverse_resolver('old.example.com', 'new.example.com')
+    assert asyncio.run(dns_enumerator.perform_reverse_dns_lookup('192.0.2.1')) == 'old.example.com'
+    monkeypatch.setattr(dns_enumerator, 'PTR_CACHE_TTL', 0)
+    assert asyncio.run(dns_enumerator.perform_reverse_dns_lookup('192.0.2.1')) == 'new.example.com'
+    assert resolver.calls == 2
+
+
+def test_concurrent_reverse_lookups_share_one_query(reverse_resolver):
+    resolver = reverse_resolver('host.example.com')
+
+    async def lookup_many():
+        return await asyncio.gather(*[dns_enumerator.perform_reverse_dns_lookup('192.0.2.1') for _ in range(5)])
+
+    assert asyncio.run(lookup_many()) == ['host.example.com'] * 5
+    assert resolver.calls == 1
+
+
+@pytest.mark.parametrize('domain, expected', [
+    ('WWW.Example.com', 'www.example.com'),
+    ('example.com.', 'example.com.'),
+    ('a' * 63 + '.com', 'a' * 63 + '.com'),
+    ('xn--bcher-kva.com', 'xn--bcher-kva.com'),
+    ('bücher.de', 'xn--bcher-kva.de'),
+    ('', None),
+    ('exa..mple.com', None),
+    ('.example.com', None),
+    ('a b.example.com', None),
+    ('_dmarc.example.com', None),
+    ('*.example.com', None),
+    ('a' * 64 + '.com', None),
+    ('-a.example.com', None),
+    ('a-.example.com', None),
+    ('ex--ample.com', None),
+    ('xn--zz.com', None),
+    (('a' * 60 + '.') * 5 + 'com', None),
+])
+def test_normalize_domain_for_dns(domain, expected):
+    assert dns_enumerator.normalizeDomainForDNS(domain) == expected
+
+
+def _crtsh(body, domain='example.com'):
+    def handler(request):
+        return httpx.Response(200, content=body)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await dns_enumerator.discover_subdomains_crtsh(domain, client)
+    return sorted(asyncio.run(run()))
+
+
+def test_crtsh_collects_names_under_the_domain():
+    certs = [
+        {'common_name': 'example.com', 'name_value': 'example.com\n*.example.com\nWWW.Example.com'},
+        {'common_name': 'mail.example.com', 'name_value': ' api.dev.example.com \n_dmarc.example.com'},
+        {'common_name': 'notexample.com', 'name_value': 'example.com.evil.org\nexample.org\nwwwexample.com'},
+        {'common_name': None, 'name_value': None},
+    ]
+    assert _crtsh(json.dumps(certs).encode()) == [
+        '_dmarc.example.com', 'api.dev.example.com', 'example.com', 'mail.example.com', 'www.example.com',
+    ]
+
+
+def test_crtsh_escapes_the_domain():
+    certs = [{'common_name': 'www.exampleXcom', 'name_value': 'www.example.com'}]
+    assert _crtsh(json.dumps(certs).encode()) == ['www.example.com']
+
+
+def test_crtsh_invalid_json_returns_no_names():
+    assert _crtsh(b'<html>busy</html>') == []
@@ -0,0 +1,75 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app import email_scraper
+
+PAGES = {
+    '/': (
+        '<a href="/about">About</a>'
+        '<a href="/missing">Missing</a>'
+        '<a href="/' + 'a' * 70000 + '">Too long</a>'
+        '<a href="http://[bad">Bad host</a>'
+        '<a href="mailto:sales@example.com">Mail</a>'
+        'root@example.com'
+    ),
+    '/about': 'team@example.com <a href="https://other.example.org/">Elsewhere</a>',
+}
+
+
+def _handler(request):
+    body = PAGES.get(request.url.path)
+    if body is None:
+        return httpx.Response(404)
+    return httpx.Response(200, text=body)
+
+
+def _scrape(url, **kwargs):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(_handler)) as client:
+            return await email_scraper.scrape_emails_from_domain(url, client=client, **kwargs)
+    return asyncio.run(run())
+
+
+def test_scrape_skips_failed_and_malformed_pages():
+    assert _scrape('https://example.com/') == {'root@example.com', 'sales@example.com', 'team@example.com'}
+
+
+def test_scrape_respects_max_pages():
+    assert _scrape('https://example.com/', max_pages=1) == {'root@example.com', 'sales@example.com'}
+
+
+PAGE = (
+    b'Contact sales@example.com or support@mail.example.co.uk. '
+    b'Jobs: <a href="mailto:jobs@example.com">jobs@example.com</a> '
+    b'not-an-email@localhost \xff\xfe bad bytes, first.last+tag@example.org'
+)
+
+# Adjacent or overlapping candidates, and word boundaries next to non-ASCII or invalid bytes
+TRICKY_PAGES = [
+    (b'john@x.com-jane@y.com', {'john@x.com', '-jane@y.com'}),
+    (b'x@y.com.z@w.org', {'x@y.com', '.z@w.org'}),
+    (b'a@b.co+c@d.org', {'a@b.co', '+c@d.org'}),
+    ('\u00e9john@example.com'.encode(), set()),
+    ('\u00e9 john@example.com'.encode(), {'john@example.com'}),
+    (b'john\xff@x.com', {'john@x.com'}),
+    (b'a@b.c\xffom\tx@y.zz', {'a@b.com', 'x@y.zz'}),
+    (b'', set()),
+]
+EXTRACT_CASES = [(PAGE, {
+    'sales@example.com', 'support@mail.example.co.uk', 'jobs@example.com', 'first.last+tag@example.org',
+})] + TRICKY_PAGES
+
+
+@pytest.mark.parametrize('data, expected', EXTRACT_CASES)
+def test_extract_emails_with_regex(monkeypatch, data, expected):
+    monkeypatch.setattr(email_scraper, 'EMAIL_DB', None)
+    assert email_scraper.extract_emails(data) == expected
+
+
+@pytest.mark.skipif(email_scraper.EMAIL_DB is None, reason='hyperscan is not installed')
+@pytest.mark.parametrize('data, expected', EXTRACT_CASES)
+def test_extract_emails_with_hyperscan(data, expected):
+    assert email_scraper.extract_emails(data) == expected
+    assert email_scraper.extract_emails(data) == set(email_scraper.EMAIL_RE.findall(data.decode(errors='ignore')))
@@ -0,0 +1,61 @@
+import httpx
+from fastapi.testclient import TestClient
+
+from app import main
+from app.email_scraper import get_http_client
+
+SITE = {
+    '/': 'Write to info@example.com <a href="/contact">Contact</a>',
+    '/contact': 'press@example.com',
+}
+
+
+def _handler(request):
+    # SpiderFoot API on 127.0.0.1:5001
+    if request.url.port == 5001:
+        if request.url.path == '/api/v1/scan/new':
+            return httpx.Response(200, json={'scan_id': 'scan-1'})
+        if request.url.path == '/api/v1/scan/scan-1':
+            return httpx.Response(200, json={'status': 'FINISHED'})
+        if request.url.path == '/api/v1/scan/scan-1/results':
+            return httpx.Response(200, json=['admin@example.com', 'info@example.com'])
+        return httpx.Response(404)
+    body = SITE.get(request.url.path)
+    if body is None:
+        return httpx.Response(404)
+    return httpx.Response(200, text=body)
+
+
+def _post_scan(handler):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    main.app.dependency_overrides[get_http_client] = lambda: client
+    try:
+        with TestClient(main.app) as test_client:
+            return test_client.post('/scan/emails', json={'domain': 'https://example.com/'})
+    finally:
+        main.app.dependency_overrides.clear()
+
+
+def test_scan_emails_uses_the_injected_client():
+    response = _post_scan(_handler)
+    assert response.status_code == 200
+    assert response.json() == {'emails': ['admin@example.com', 'info@example.com', 'press@example.com']}
+
+
+def test_scan_emails_falls_back_to_scraping_when_spiderfoot_fails():
+    def handler(request):
+        if request.url.port == 5001:
+            raise httpx.ConnectError('connection refused', request=request)
+        return _handler(request)
+
+    response = _post_scan(handler)
+    assert response.status_code == 200
+    assert response.json() == {'emails': ['info@example.com', 'press@example.com']}
+
+
+def test_lifespan_closes_the_shared_client(monkeypatch):
+    shared = httpx.AsyncClient()
+    monkeypatch.setattr(main, 'CLIENT', shared)
+    with TestClient(main.app):
+        assert not shared.is_closed
+    assert shared.is_closed
@@ -0,0 +1,222 @@
+import asyncio
+import errno
+import socket
+
+import httpx
+import orjson
+import pytest
+
+import port_scanner
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    port_scanner.invalidate_dns_cache()
+    port_scanner._SCAN_CACHE.clear()
+    yield
+    port_scanner.invalidate_dns_cache()
+    port_scanner._SCAN_CACHE.clear()
+
+
+async def _no_doh(url, domain):
+    return None
+
+
+def test_system_resolve_rejects_malformed_hostname():
+    assert asyncio.run(port_scanner._system_resolve('exa..mple.com')) is None
+
+
+def test_run_port_scan_reports_error_for_malformed_hostname(monkeypatch):
+    monkeypatch.setattr(port_scanner, '_doh_query', _no_doh)
+    result = asyncio.run(port_scanner.run_port_scan('exa..mple.com'))
+    assert result['status'] == 'error'
+    assert result['note'] == 'DNS resolution failed.'
+
+
+def test_socket_errors_do_not_abort_the_scan(monkeypatch):
+    real_socket = port_scanner.socket.socket
+
+    def no_fds(family=-1, type=-1, proto=-1, fileno=None):
+        # Still let asyncio wrap the descriptors of its own self-pipe
+        if fileno is not None:
+            return real_socket(family, type, proto, fileno)
+        raise OSError(errno.EMFILE, 'Too many open files')
+
+    monkeypatch.setattr(port_scanner.socket, 'socket', no_fds)
+    result = asyncio.run(port_scanner.run_port_scan('127.0.0.1', [1, 2, 3]))
+    assert result['status'] == 'success'
+    assert result['ports'] == []
+
+
+def test_ip_address_helpers():
+    assert port_scanner.is_valid_ip_address('192.0.2.1')
+    assert port_scanner.is_valid_ip_address('::1')
+    assert not port_scanner.is_valid_ip_address('example.com')
+    assert port_scanner.is_valid_ipv4_address('192.0.2.1')
+    assert not port_scanner.is_valid_ipv4_address('::1')
+    assert not port_scanner.is_valid_ipv4_address('example.com')
+
+
+def test_dns_cache_is_bounded_lru(monkeypatch):
+    monkeypatch.setattr(port_scanner, 'DNS_CACHE_MAXSIZE', 2)
+    port_scanner.invalidate_dns_cache()
+    port_scanner._dns_cache_put('a.example', '192.0.2.1', 300)
+    port_scanner._dns_cache_put('b.example', '192.0.2.2', 300)
+    assert port_scanner._dns_cache_get('a.example') == '192.0.2.1'
+    port_scanner._dns_cache_put('c.example', '192.0.2.3', 300)
+    assert port_scanner._dns_cache_get('b.example') is None
+    assert port_scanner._dns_cache_get('a.example') == '192.0.2.1'
+    port_scanner.invalidate_dns_cache('a.example')
+    assert port_scanner._dns_cache_get('a.example') is None
+    port_scanner.invalidate_dns_cache()
+
+
+@pytest.mark.parametrize('early_exit', [0, -1])
+def test_early_exit_must_be_positive(early_exit):
+    with pytest.raises(ValueError):
+        asyncio.run(port_scanner.run_port_scan('127.0.0.1', [1], early_exit=early_exit))
+    with pytest.raises(ValueError):
+        asyncio.run(port_scanner.local_port_check_python('127.0.0.1', [1], early_exit=early_exit))
+
+
+def _listening_ports(count):
+    servers = [socket.create_server(('127.0.0.1', 0)) for _ in range(count)]
+    return servers, [server.getsockname()[1] for server in servers]
+
+
+def test_large_scans_use_fast_port_scan(monkeypatch):
+    calls = []
+    real_fast_port_scan = port_scanner.fast_port_scan
+
+    def spy(ip, ports, *args):
+        calls.append(len(ports))
+        return real_fast_port_scan(ip, ports, *args)
+
+    monkeypatch.setattr(port_scanner, 'FAST_SCAN_MIN_PORTS', 3)
+    monkeypatch.setattr(port_scanner, 'fast_port_scan', spy)
+    servers, open_ports = _listening_ports(2)
+    try:
+        result = asyncio.run(port_scanner.local_port_check_python('127.0.0.1', open_ports + [1]))
+        assert calls == [3]
+        assert result['ports'] == sorted(open_ports)
+
+        # early_exit needs the asyncio path, which can stop part way
+        result = asyncio.run(port_scanner.local_port_check_python('127.0.0.1', open_ports + [1], early_exit=1))
+        assert calls == [3]
+        assert len(result['ports']) == 1
+    finally:
+        for server in servers:
+            server.close()
+
+
+class _DoHTransport(httpx.AsyncBaseTransport):
+    """Answers DoH requests with an async handler, so responses can be delayed."""
+
+    def __init__(self, handler):
+        self.handler = handler
+
+    async def handle_async_request(self, request):
+        return await self.handler(request)
+
+
+def _use_doh(monkeypatch, handler):
+    monkeypatch.setattr(port_scanner, '_DOH_CLIENT', httpx.AsyncClient(transport=_DoHTransport(handler)))
+
+
+def _json(answers, status=0):
+    return httpx.Response(200, content=orjson.dumps({'Status': status, 'Answer': answers}))
+
+
+def test_doh_waits_for_a_resolver_with_an_answer(monkeypatch):
+    async def handler(request):
+        if request.url.host == 'dns.google':
+            await asyncio.sleep(0.05)
+            return _json([
+                {'name': 'www.example.com', 'type': 5, 'TTL': 60, 'data': 'example.com.'},
+                {'name': 'example.com', 'type': 1, 'TTL': 60, 'data': '192.0.2.7'},
+            ])
+        return _json([], status=3)
+
+    _use_doh(monkeypatch, handler)
+    assert asyncio.run(port_scanner._doh_resolve('www.example.com')) == '192.0.2.7'
+    assert port_scanner._dns_cache_get('www.example.com') == '192.0.2.7'
+
+
+def test_doh_returns_none_when_every_resolver_fails(monkeypatch):
+    async def handler(request):
+        if request.url.host == 'dns.google':
+            raise httpx.ConnectError('unreachable', request=request)
+        return httpx.Response(500, text='server error')
+
+    _use_doh(monkeypatch, handler)
+    assert asyncio.run(port_scanner._doh_resolve('www.example.com')) is None
+    assert port_scanner._dns_cache_get('www.example.com') is None
+
+
+def test_doh_gives_up_after_hedge_timeout(monkeypatch):
+    async def handler(request):
+        await asyncio.sleep(1)
+        return _json([{'name': 'www.example.com', 'type': 1, 'TTL': 60, 'data': '192.0.2.7'}])
+
+    _use_doh(monkeypatch, handler)
+    monkeypatch.setattr(port_scanner, 'DOH_HEDGE_TIMEOUT', 0.05)
+    assert asyncio.run(port_scanner._doh_resolve('www.example.com')) is None
+
+
+def test_resolve_leaves_ip_literals_alone():
+    assert asyncio.run(port_scanner.resolve_domain_to_ip('192.0.2.1')) == '192.0.2.1'
+    assert asyncio.run(port_scanner.resolve_domain_to_ip('2001:db8::1')) == '2001:db8::1'
+
+
+def test_scan_cache_is_keyed_on_ports_and_early_exit(monkeypatch):
+    calls = []
+
+    async def fake_check(ip, ports=None, early_exit=None):
+        calls.append((ip, ports, early_exit))
+        service = port_scanner.PortService(443, 'https', 'https')
+        return port_scanner._port_check_result(ip, [service])
+
+    monkeypatch.setattr(port_scanner, 'local_port_check_python', fake_check)
+
+    async def scan_all():
+        first = await port_scanner.run_port_scan('192.0.2.1', [443, 80])
+        first['services'].clear()
+        return [
+            first,
+            await port_scanner.run_port_scan('192.0.2.1', [443, 80]),
+            await port_scanner.run_port_scan('192.0.2.1', [443, 80], early_exit=1),
+            await port_scanner.run_port_scan('192.0.2.1', [443]),
+            await port_scanner.run_port_scan('192.0.2.1'),
+        ]
+
+    results = asyncio.run(scan_all())
+    assert calls == [
+        ('192.0.2.1', (443, 80), None),
+        ('192.0.2.1', (443, 80), 1),
+        ('192.0.2.1', (443,), None),
+        ('192.0.2.1', None, None),
+    ]
+    # Cached results are copies, so callers cannot change what later scans see
+    assert results[1]['services'] == [{'port': 443, 'protocol': 'https', 'service': 'https'}]
+
+
+def test_early_exit_probes_the_first_wave_first(monkeypatch):
+    probed = []
+
+    async def fake_check(ip, port):
+        probed.append(port)
+        await asyncio.sleep(0)
+        if port in (80, 8080):
+            return port_scanner.PortService(port, 'http', 'http')
+        return None
+
+    monkeypatch.setattr(port_scanner, 'check_single_port_python', fake_check)
+
+    result = asyncio.run(port_scanner.local_port_check_python('192.0.2.1', early_exit=1))
+    assert sorted(probed) == sorted(port_scanner.FIRST_WAVE_PORTS)
+    assert result['ports'] == [80]
+
+    probed.clear()
+    result = asyncio.run(port_scanner.local_port_check_python('192.0.2.1', early_exit=2))
+    assert sorted(probed) == sorted(port_scanner.COMMON_PORTS)
+    assert result['ports'] == [80, 8080]
@@ -0,0 +1,33 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app import spiderfoot_scraper
+
+
+def _call(func, *args):
+    async def run():
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, text='<html>not json</html>'))
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await func(*args, client=client)
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize('func, args', [
+    (spiderfoot_scraper.start_new_scan, ('example.com',)),
+    (spiderfoot_scraper.check_scan_status, ('scan-1',)),
+    (spiderfoot_scraper.get_scan_results, ('scan-1',)),
+])
+def test_non_json_response_becomes_http_exception(func, args):
+    with pytest.raises(HTTPException) as exc_info:
+        _call(func, *args)
+    assert exc_info.value.status_code == 500
+
+
+def test_shared_client_pool_is_bounded():
+    pool = spiderfoot_scraper.CLIENT._transport._pool
+    assert pool._max_connections == 100
+    assert pool._max_keepalive_connections == 20
+    assert pool._keepalive_expiry == 300